@@ -1,34 +1,105 @@
 
-import io, os, json
-from typing import List, Dict
+import io, os, re, json
+import asyncio
+from typing import List, Dict, Tuple, Union, Optional, BinaryIO, Iterator
 import streamlit as st
 
-from transformers import pipeline
+import torch
+from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
 from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.dml.color import RGBColor
 
 # ---------------- Helpers -----------------
 
+def _load_quantized_model(model_name: str):
+    """
+    Load the seq2seq weights at reduced precision: int8 via bitsandbytes on GPU
+    (bf16 if bitsandbytes/accelerate are missing), dynamic int8 Linear layers on CPU.
+    """
+    if torch.cuda.is_available():
+        try:
+            import bitsandbytes  # noqa: F401
+            from transformers import BitsAndBytesConfig
+            return AutoModelForSeq2SeqLM.from_pretrained(
+                model_name, quantization_config=BitsAndBytesConfig(load_in_8bit=True), device_map={"": 0})
+        except ImportError:
+            dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float32
+            return AutoModelForSeq2SeqLM.from_pretrained(model_name, torch_dtype=dtype).to("cuda")
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+# exported + optimized ONNX graphs, written once and loaded on later process starts
+ONNX_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ai_slide_generator", "onnx")
+
+def _load_onnx_model(model_name: str):
+    """
+    Load the seq2seq model on ONNX Runtime (CPU) with optimum's level-99 graph fusions
+    (LayerNorm/GELU/attention). The export runs once and is cached under ONNX_CACHE_DIR.
+    Returns None when optimum[onnxruntime] is not installed.
+    """
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTOptimizer
+        from optimum.onnxruntime.configuration import OptimizationConfig
+    except ImportError:
+        return None
+    save_dir = os.path.join(ONNX_CACHE_DIR, model_name.replace("/", "--"))
+    if not os.path.isdir(save_dir):
+        tmp_dir = save_dir + ".partial"
+        exported = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True)
+        ORTOptimizer.from_pretrained(exported).optimize(
+            save_dir=tmp_dir, optimization_config=OptimizationConfig(optimization_level=99))
+        # only a complete export is ever visible at save_dir
+        os.replace(tmp_dir, save_dir)
+    return ORTModelForSeq2SeqLM.from_pretrained(save_dir, provider="CPUExecutionProvider")
+
 @st.cache_resource(show_spinner=False)
 def load_model(model_name: str = "google/flan-t5-small"):
-    # single pipeline for text2text generation to handle bullets + speaker notes
-    return pipeline("text2text-generation", model=model_name, tokenizer=model_name, device_map=None)
+    """
+    Load the (tokenizer, model) pair used for bullets + speaker notes; generation calls
+    `model.generate` directly on batched inputs rather than going through a pipeline.
+    """
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    # batched calls pad prompts to a common length
+    tokenizer.padding_side = "left"
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    # ONNX Runtime on CPU when available; otherwise reduced-precision PyTorch weights
+    model = None if torch.cuda.is_available() else _load_onnx_model(model_name)
+    if model is None:
+        model = _load_quantized_model(model_name)
+    # one tiny generation so lazy weight init / kernel selection happens at load time
+    _generate((tokenizer, model), ["warmup"], max_new_tokens=4)
+    return tokenizer, model
 
+def _generate(model, prompts: List[str], max_new_tokens: int = 160) -> List[str]:
+    # `model` is the (tokenizer, model) pair from load_model: one tokenize, one generate, one decode
+    tok, mdl = model
+    enc = tok(prompts, padding=True, truncation=True, return_tensors="pt").to(mdl.device)
+    with torch.inference_mode():
+        out = mdl.generate(**enc, max_new_tokens=max_new_tokens, do_sample=False, num_beams=1)
+    return tok.batch_decode(out, skip_special_tokens=True)
+
+# a sentence up to and including its terminal punctuation, or a trailing unterminated fragment
+_SENT = re.compile(r"[^.!?]*[.!?]+\s*|[^.!?]+$")
+
+@st.cache_data(show_spinner=False)
 def chunk_text(text: str, max_chars: int = 900) -> List[str]:
     text = " ".join(text.split())
     chunks = []
-    start = 0
-    while start < len(text):
-        end = min(start + max_chars, len(text))
-        slice_ = text[start:end]
-        last_punct = max(slice_.rfind("."), slice_.rfind("?"), slice_.rfind("!"))
-        if last_punct == -1 or end == len(text):
-            cut = end
-        else:
-            cut = start + last_punct + 1
-        chunks.append(text[start:cut].strip())
-        start = cut
+    buf, size = [], 0
+    for m in _SENT.finditer(text):
+        sent = m.group()
+        if buf and size + len(sent) > max_chars:
+            chunks.append("".join(buf).strip())
+            buf, size = [], 0
+        while len(sent) > max_chars:
+            chunks.append(sent[:max_chars].strip())
+            sent = sent[max_chars:]
+        buf.append(sent)
+        size += len(sent)
+    if buf:
+        chunks.append("".join(buf).strip())
     merged=[]
     for ch in chunks:
         if merged and len(ch) < 200:
@@ -37,10 +108,11 @@ def chunk_text(text: str, max_chars: int = 900) -> List[str]:
             merged.append(ch)
     return [c for c in merged if c]
 
-def generate_bullets(model, text: str, max_bullets: int = 5) -> List[str]:
-    prompt = ("Summarize the following content into concise presentation bullets. "
-              f"Return {max_bullets} or fewer bullet points. Do not number them. Keep each bullet under 18 words.\\n\\nContent:\\n" + text)
-    out = model(prompt, max_new_tokens=160, do_sample=False)[0]["generated_text"]
+def _bullets_prompt(text: str, max_bullets: int) -> str:
+    return ("Summarize the following content into concise presentation bullets. "
+            f"Return {max_bullets} or fewer bullet points. Do not number them. Keep each bullet under 18 words.\\n\\nContent:\\n" + text)
+
+def _parse_bullets(out: str, max_bullets: int) -> List[str]:
     lines = [ln.strip("-• \n\t") for ln in out.split("\n") if ln.strip()]
     if len(lines) <= 2:
         tmp=[]
@@ -59,14 +131,112 @@ def generate_bullets(model, text: str, max_bullets: int = 5) -> List[str]:
             break
     return bullets
 
-def generate_speaker_notes(model, title: str, bullets: List[str]) -> str:
+def _notes_prompt(title: str, bullets: List[str]) -> str:
+    text = f"Write a concise speaker note for a presentation slide titled '{title}'. Use the following bullet points as the slide content: " + " | ".join(bullets)
+    return text + " Keep it under 120 words and conversational."
+
+def _source_notes_prompt(title: str, text: str) -> str:
+    text = f"Write a concise speaker note for a presentation slide titled '{title}', based on the following content: " + text
+    return text + " Keep it under 120 words and conversational."
+
+def generate_bullets_batch(model, texts: List[str], max_bullets: Union[int, List[int]] = 5) -> List[List[str]]:
     """
-    Create a short speaker note for a slide based on title + bullets.
+    Generate bullets for several texts with a single batched generate call.
+    `max_bullets` may be one limit for all texts or one limit per text.
     """
-    text = f"Write a concise speaker note for a presentation slide titled '{title}'. Use the following bullet points as the slide content: " + " | ".join(bullets)
-    prompt = text + " Keep it under 120 words and conversational."
-    out = model(prompt, max_new_tokens=160, do_sample=False)[0]["generated_text"]
-    return out.strip()
+    if not texts:
+        return []
+    if isinstance(max_bullets, int):
+        max_bullets = [max_bullets] * len(texts)
+    prompts = [_bullets_prompt(t, n) for t, n in zip(texts, max_bullets)]
+    outs = _generate(model, prompts)
+    return [_parse_bullets(o, n) for o, n in zip(outs, max_bullets)]
+
+def generate_speaker_notes_batch(model, titles: List[str], bullets_list: List[List[str]]) -> List[str]:
+    """
+    Create short speaker notes for several slides with a single batched generate call.
+    """
+    if not titles:
+        return []
+    prompts = [_notes_prompt(t, b) for t, b in zip(titles, bullets_list)]
+    return [o.strip() for o in _generate(model, prompts)]
+
+def generate_single_slide(model, title: str, text: str, max_bullets: int = 5) -> Tuple[List[str], str]:
+    """
+    Bullets and speaker note for a one-slide deck in a single two-prompt call.
+    The note is written from the source text since the bullets do not exist yet.
+    """
+    outs = _generate(model, [_bullets_prompt(text, max_bullets), _source_notes_prompt(title, text)])
+    return _parse_bullets(outs[0], max_bullets), outs[1].strip()
+
+# on GPU, sub-batches run in worker threads so tokenization of one overlaps model compute of another;
+# on CPU every generate call already uses all cores, so all prompts go through one batched call
+GEN_BATCH_SIZE = 8
+GEN_CONCURRENCY = max(1, min(4, os.cpu_count() or 1)) if torch.cuda.is_available() else 1
+
+async def _gather_batches(fn, model, *columns, batch_size: int = GEN_BATCH_SIZE, concurrency: int = GEN_CONCURRENCY) -> List:
+    if concurrency <= 1:
+        return await asyncio.to_thread(fn, model, *columns)
+    sem = asyncio.Semaphore(concurrency)
+    async def run(start: int):
+        async with sem:
+            return await asyncio.to_thread(fn, model, *(c[start:start+batch_size] for c in columns))
+    parts = await asyncio.gather(*(run(i) for i in range(0, len(columns[0]), batch_size)))
+    return [item for part in parts for item in part]
+
+async def gen_bullets_async(model, texts: List[str], max_bullets: Union[int, List[int]] = 5) -> List[List[str]]:
+    if isinstance(max_bullets, int):
+        max_bullets = [max_bullets] * len(texts)
+    return await _gather_batches(generate_bullets_batch, model, texts, max_bullets)
+
+async def gen_speaker_notes_async(model, titles: List[str], bullets_list: List[List[str]]) -> List[str]:
+    return await _gather_batches(generate_speaker_notes_batch, model, titles, bullets_list)
+
+def _bullets_dedup(model_name: str, texts: List[str], max_bullets: List[int]) -> List[List[str]]:
+    # repeated boilerplate chunks in one deck are generated once; reruns are covered by cached_bullets_batch
+    keys = [(t, n) for t, n in zip(texts, max_bullets)]
+    unique = list(dict.fromkeys(keys))
+    results = asyncio.run(gen_bullets_async(load_model(model_name), [k[0] for k in unique], [k[1] for k in unique]))
+    found = dict(zip(unique, results))
+    return [list(found[k]) for k in keys]
+
+# keeps the conclusion prompt well under flan-t5's 512-token encoder limit (~4 chars per token)
+CONCLUSION_MAX_CHARS = 1500
+
+def conclusion_source(bullets_all: List[List[str]], max_chars: int = CONCLUSION_MAX_CHARS) -> str:
+    """
+    Lead bullets from every section for the conclusion prompt: two per section when they fit,
+    otherwise one, and for long decks an even sample so later sections are not cut off by truncation.
+    """
+    for per_section in (2, 1):
+        lines = [b for bullets in bullets_all for b in bullets[:per_section]]
+        summary = "\n".join(lines)
+        if len(summary) <= max_chars:
+            return summary
+    step = -(-len(summary) // max_chars)
+    picked, size = [], 0
+    for ln in lines[::step]:
+        if size + len(ln) + 1 > max_chars:
+            break
+        picked.append(ln)
+        size += len(ln) + 1
+    return "\n".join(picked) or lines[0][:max_chars]
+
+# cache_data shims: keyed on the model name (the loaded model itself is not hashable)
+@st.cache_data(show_spinner=False)
+def cached_bullets_batch(model_name: str, texts: List[str], max_bullets: Union[int, List[int]] = 5) -> List[List[str]]:
+    if isinstance(max_bullets, int):
+        max_bullets = [max_bullets] * len(texts)
+    return _bullets_dedup(model_name, texts, max_bullets)
+
+@st.cache_data(show_spinner=False)
+def cached_speaker_notes_batch(model_name: str, titles: List[str], bullets_list: List[List[str]]) -> List[str]:
+    return asyncio.run(gen_speaker_notes_async(load_model(model_name), titles, bullets_list))
+
+# one prompt per call, so there is nothing to dedup; reruns are still covered by cache_data
+@st.cache_data(show_spinner=False)
+def cached_single_slide(model_name: str, title: str, text: str, max_bullets: int = 5) -> Tuple[List[str], str]:
+    return generate_single_slide(load_model(model_name), title, text, max_bullets)
 
 def hex_to_rgb(hex_color: str) -> RGBColor:
     hex_color = hex_color.lstrip("#")
@@ -76,43 +246,50 @@ def pick_contrasting_text(rgb: RGBColor) -> RGBColor:
     brightness = (0.299*rgb[0] + 0.587*rgb[1] + 0.114*rgb[2])
     return RGBColor(0,0,0) if brightness > 186 else RGBColor(255,255,255)
 
-def add_title_slide(prs: Presentation, title: str, subtitle: str, theme_hex: str, font_name: str):
+theme_map = {
+    "Classic Dark": "#1F2937",
+    "Light Minimal": "#FFFFFF",
+    "Blue Gradient": "#0B69FF",
+    "Warm Accent": "#FF7043"
+}
+
+# (background, contrasting text) colors per preset
+theme_lut = {name: (hex_to_rgb(v), pick_contrasting_text(hex_to_rgb(v))) for name, v in theme_map.items()}
+
+def _style_runs(paragraphs, font_name: str, color: RGBColor, size=None, bold: bool = False):
+    # applied once per shape after its text is set
+    for p in paragraphs:
+        for run in p.runs:
+            font = run.font
+            font.color.rgb = color
+            if size is not None:
+                font.size = size
+            if bold:
+                font.bold = True
+            font.name = font_name
+
+def add_title_slide(prs: Presentation, title: str, subtitle: str, theme_rgb: RGBColor, tcolor: RGBColor, font_name: str):
     slide_layout = prs.slide_layouts[0]
     slide = prs.slides.add_slide(slide_layout)
     fill = slide.background.fill
     fill.solid()
-    fill.fore_color.rgb = hex_to_rgb(theme_hex)
+    fill.fore_color.rgb = theme_rgb
     title_shape = slide.shapes.title
     subtitle_shape = slide.placeholders[1]
     title_shape.text = title
     subtitle_shape.text = subtitle
-    tcolor = pick_contrasting_text(hex_to_rgb(theme_hex))
     for shp in (title_shape, subtitle_shape):
-        for p in shp.text_frame.paragraphs:
-            for run in p.runs:
-                run.font.color.rgb = tcolor
-                try:
-                    run.font.name = font_name
-                except Exception:
-                    pass
-
-def add_bullet_slide(prs: Presentation, title: str, bullets: List[str], speaker_note: str, theme_hex: str, font_name: str):
+        _style_runs(shp.text_frame.paragraphs, font_name, tcolor)
+
+def add_bullet_slide(prs: Presentation, title: str, bullets: List[str], speaker_note: str, theme_rgb: RGBColor, tcolor: RGBColor, font_name: str):
     slide_layout = prs.slide_layouts[1]
     slide = prs.slides.add_slide(slide_layout)
     fill = slide.background.fill
     fill.solid()
-    fill.fore_color.rgb = hex_to_rgb(theme_hex)
+    fill.fore_color.rgb = theme_rgb
     title_shape = slide.shapes.title
     title_shape.text = title
-    tcolor = pick_contrasting_text(hex_to_rgb(theme_hex))
-    for p in title_shape.text_frame.paragraphs:
-        for run in p.runs:
-            run.font.color.rgb = tcolor
-            run.font.bold = True
-            try:
-                run.font.name = font_name
-            except Exception:
-                pass
+    _style_runs(title_shape.text_frame.paragraphs, font_name, tcolor, bold=True)
     body = slide.placeholders[1]
     tf = body.text_frame
     tf.clear()
@@ -123,42 +300,42 @@ def add_bullet_slide(prs: Presentation, title: str, bullets: List[str], speaker_
             p = tf.add_paragraph()
         p.text = b
         p.level = 0
-        for run in p.runs:
-            run.font.size = Pt(22)
-            run.font.color.rgb = tcolor
-            try:
-                run.font.name = font_name
-            except Exception:
-                pass
+    _style_runs(tf.paragraphs, font_name, tcolor, size=Pt(22))
     # add speaker notes
     notes_slide = slide.notes_slide
     text_frame = notes_slide.notes_text_frame
     text_frame.clear()
     text_frame.text = speaker_note
 
-def make_presentation(slides_data: List[Dict], theme_hex: str = "#1F2937", font_name: str = "Calibri") -> bytes:
+def make_presentation(slides_data: List[Dict], theme_colors: Tuple[RGBColor, RGBColor] = theme_lut["Classic Dark"],
+                      font_name: str = "Calibri", out_stream: Optional[BinaryIO] = None) -> BinaryIO:
+    """
+    Build the .pptx and return a stream positioned at its start.
+    `theme_colors` is a (background, text) pair from `theme_lut`.
+    Pass `out_stream` (e.g. a tempfile.NamedTemporaryFile) to write very large decks to disk instead of memory.
+    """
     prs = Presentation()
+    theme_rgb, tcolor = theme_colors
     for s in slides_data:
         if s["type"] == "title":
-            add_title_slide(prs, s.get("title","Title"), s.get("subtitle",""), theme_hex, font_name)
+            add_title_slide(prs, s.get("title","Title"), s.get("subtitle",""), theme_rgb, tcolor, font_name)
         else:
-            add_bullet_slide(prs, s.get("title","Slide"), s.get("bullets",[]), s.get("notes",""), theme_hex, font_name)
-    bio = io.BytesIO()
+            add_bullet_slide(prs, s.get("title","Slide"), s.get("bullets",[]), s.get("notes",""), theme_rgb, tcolor, font_name)
+    bio = out_stream if out_stream is not None else io.BytesIO()
     prs.save(bio)
     bio.seek(0)
-    return bio.read()
+    return bio
+
+GOOGLE_SLIDES_NOTE = "This JSON contains placeholder requests. You must map objectIds after creation via the Slides API when running batchUpdate."
 
-def build_google_slides_requests(slides_data: List[Dict], theme_hex: str, font_family: str) -> Dict:
+def iter_google_slides_requests(slides_data: List[Dict]) -> Iterator[Dict]:
     """
-    Build a Google Slides batchUpdate-style requests list that can be sent to the Google Slides API.
-    This returns a JSON dict with 'requests' that the user can apply after obtaining OAuth credentials.
+    Yield Google Slides batchUpdate requests one at a time as each slide is visited.
     """
-    requests = []
-    # create presentation (title)
     # For simplicity: we'll create slides and add text boxes. Users will need to run this via Slides API.
     for idx, s in enumerate(slides_data):
         # create slide
-        create_req = {
+        yield {
             "createSlide": {
                 "slideLayoutReference": {
                     "predefinedLayout": "TITLE_AND_BODY"
@@ -166,7 +343,6 @@ def build_google_slides_requests(slides_data: List[Dict], theme_hex: str, font_f
                 "insertionIndex": idx
             }
         }
-        requests.append(create_req)
         # add title text
         title_text = s.get("title","")
         body_text = ""
@@ -175,21 +351,41 @@ def build_google_slides_requests(slides_data: List[Dict], theme_hex: str, font_f
         else:
             body_text = "\\n".join(s.get("bullets",[]))
         # text insertion requests (for newly created slide) using placeholders
-        requests.append({
+        yield {
             "insertText": {
                 "objectId": f"TITLE_{idx}",
                 "insertionIndex": 0,
                 "text": title_text
             }
-        })
-        requests.append({
+        }
+        yield {
             "insertText": {
                 "objectId": f"BODY_{idx}",
                 "insertionIndex": 0,
                 "text": body_text
             }
-        })
-    return {"requests": requests, "note": "This JSON contains placeholder requests. You must map objectIds after creation via the Slides API when running batchUpdate."}
+        }
+
+def write_google_slides_json(slides_data: List[Dict], theme_hex: str, font_family: str,
+                             out_stream: Optional[BinaryIO] = None) -> BinaryIO:
+    """
+    Write a Google Slides batchUpdate-style JSON document ({"requests": [...], "note": ...}, indent=2)
+    that the user can apply after obtaining OAuth credentials. Each request is encoded into
+    `out_stream` as it is generated instead of materializing the whole document.
+    """
+    bio = out_stream if out_stream is not None else io.BytesIO()
+    encoder = json.JSONEncoder(indent=2)
+    bio.write(b'{\n  "requests": [')
+    wrote_any = False
+    for req in iter_google_slides_requests(slides_data):
+        bio.write(b",\n    " if wrote_any else b"\n    ")
+        wrote_any = True
+        for chunk in encoder.iterencode(req):
+            # encoded strings never contain raw newlines, so this only re-indents structure
+            bio.write(chunk.replace("\n", "\n    ").encode("utf-8"))
+    bio.write((b"\n  ]" if wrote_any else b"]") + b',\n  "note": ' + json.dumps(GOOGLE_SLIDES_NOTE).encode("utf-8") + b"\n}")
+    bio.seek(0)
+    return bio
 
 # ---------------- Streamlit UI -----------------
 
@@ -209,6 +405,10 @@ with st.sidebar:
     theme_preset = st.selectbox("Choose theme preset", ["Classic Dark","Light Minimal","Blue Gradient","Warm Accent"])
     font_choice = st.selectbox("Font family (used for PPTX)", ["Calibri","Arial","Georgia","Tahoma","Verdana"])
 
+# load (and warm) the model on app start so the first Generate click skips the cold path
+with st.spinner("Loading model..."):
+    load_model(model_choice)
+
 col1, col2 = st.columns([2,1])
 with col1:
     text_input = st.text_area("Paste source text", height=320)
@@ -225,33 +425,31 @@ if sample:
 
 gen = st.button("Generate Slides")
 
-theme_map = {
-    "Classic Dark": "#1F2937",
-    "Light Minimal": "#FFFFFF",
-    "Blue Gradient": "#0B69FF",
-    "Warm Accent": "#FF7043"
-}
-
 if gen:
     if not text_input.strip():
         st.error("Please paste text first")
         st.stop()
-    with st.spinner("Loading model..."):
-        model = load_model(model_choice)
     chunks = chunk_text(text_input, max_chars=max_chars)
     slides = []
     title = title_override.strip() or (text_input.splitlines()[0] if text_input.splitlines() and len(text_input.splitlines()[0])>6 else "Presentation")
     subtitle = subtitle_override.strip() or "Generated automatically"
     slides.append({"type":"title","title":title,"subtitle":subtitle})
-    for i,ch in enumerate(chunks, start=1):
-        bullets = generate_bullets(model, ch, max_bullets=max_bullets)
-        slide_title = f"Section {i}"
-        notes = generate_speaker_notes(model, slide_title, bullets)
+    titles = [f"Section {i}" for i in range(1, len(chunks)+1)]
+    if len(chunks) == 1 and not add_conclusion:
+        # short input: bullets and notes in one two-prompt call
+        bullets, notes = cached_single_slide(model_choice, titles[0], chunks[0], max_bullets)
+        bullets_all, notes_all = [bullets], [notes]
+    else:
+        # one batched call for every slide's bullets, then one for every slide's notes
+        bullets_all = cached_bullets_batch(model_choice, chunks, max_bullets=max_bullets)
+        if add_conclusion:
+            # summarize the generated bullets rather than re-reading the whole source text
+            titles.append("Conclusion")
+            summary = conclusion_source(bullets_all)
+            bullets_all = bullets_all + cached_bullets_batch(model_choice, ["Overall: " + summary], max_bullets=4)
+        notes_all = cached_speaker_notes_batch(model_choice, titles, bullets_all)
+    for slide_title, bullets, notes in zip(titles, bullets_all, notes_all):
         slides.append({"type":"content","title":slide_title,"bullets":bullets,"notes":notes})
-    if add_conclusion:
-        bullets = generate_bullets(model, "Overall: " + text_input, max_bullets=4)
-        notes = generate_speaker_notes(model, "Conclusion", bullets)
-        slides.append({"type":"content","title":"Conclusion","bullets":bullets,"notes":notes})
 
     # Preview
     if show_preview:
@@ -267,14 +465,14 @@ if gen:
 
     # Build PPTX
     theme_hex = theme_map.get(theme_preset, "#1F2937")
+    theme_colors = theme_lut.get(theme_preset, theme_lut["Classic Dark"])
     with st.spinner("Building PPTX..."):
-        pptx_bytes = make_presentation(slides, theme_hex=theme_hex, font_name=font_choice)
+        pptx_stream = make_presentation(slides, theme_colors=theme_colors, font_name=font_choice)
     st.success("PPTX ready")
-    st.download_button("Download .pptx", data=pptx_bytes, file_name="ai_slides_with_notes.pptx", mime="application/vnd.openxmlformats-officedocument.presentationml.presentation")
+    st.download_button("Download .pptx", data=pptx_stream, file_name="ai_slides_with_notes.pptx", mime="application/vnd.openxmlformats-officedocument.presentationml.presentation")
 
     # Build Google Slides JSON (requests)
-    gs_json = build_google_slides_requests(slides, theme_hex, font_choice)
-    gs_bytes = io.BytesIO(json.dumps(gs_json, indent=2).encode("utf-8"))
+    gs_bytes = write_google_slides_json(slides, theme_hex, font_choice)
     st.download_button("Download Google Slides batchUpdate JSON (manual apply)", data=gs_bytes, file_name="google_slides_requests.json", mime="application/json")
     st.info("Note: The JSON contains placeholder requests. To fully apply them you must run the Google Slides API batchUpdate and map objectIds created at runtime. See instructions below.")
 